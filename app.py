@@ -5,6 +5,7 @@ from fastapi.templating import Jinja2Templates
 
 # Reuse your LangGraph "app" (compiled graph)
 from model import app as travel_graph   # 👈 import your LangGraph app
+from planner import initial_state
 
 app = FastAPI()
 
@@ -46,8 +47,11 @@ async def plan_trip(
     """
 
 
-    result = travel_graph.invoke({"messages": [("user", user_prompt)]})
+    result = travel_graph.invoke(initial_state([("user", user_prompt)]))
     print("🗺️ Trip planned!",result)
+    truncation_reason = result.get("truncation_reason", "")
+    if truncation_reason:
+        print(f"⏱️ Plan truncated: {truncation_reason}")
 
     # Extract final model response
     last_msg = result["messages"][-1]
@@ -67,5 +71,6 @@ async def plan_trip(
             "interests": interests,
             "budget": budget,
             "itinerary": itinerary,
+            "truncation_reason": truncation_reason,
         },
     )
@@ -0,0 +1,123 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# -------------------- Process pool for CPU-bound tools --------------------
+# Keeps heavy model calls off the MCP server's event loop so I/O tools stay
+# responsive. The queue is bounded: a call is rejected with PoolBusy instead
+# of piling up behind a backlog it could never clear.
+
+
+class PoolBusy(RuntimeError):
+    """Raised when every worker is busy and the pending queue is full."""
+
+
+class CpuPool:
+    """Bounded process pool with per-call timeouts and cancellation, started on first use or by `start()`.
+
+    Workers are spawned rather than forked, since the pool may first start inside
+    a server with live threads. A pool broken by a crashed worker or a failing
+    initializer is replaced with a fresh one.
+    """
+
+    def __init__(self, workers: int, queue_size: int, initializer=None, initargs=(), start_method: str = "spawn"):
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self._initializer = initializer
+        self._initargs = initargs
+        self._context = multiprocessing.get_context(start_method)
+        self._executor = None
+        self._slots = None
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=self._context,
+                initializer=self._initializer, initargs=self._initargs,
+            )
+            self._slots = asyncio.Semaphore(self.capacity)
+
+    def _replace_broken(self, executor):
+        """Drop a broken executor so the next call starts fresh workers (once, however many calls saw it break)."""
+        if executor is not None and self._executor is executor:
+            print(f"\n♻️ Process pool broken, restarting {self.workers} workers")
+            self.shutdown()
+
+    def start(self, ready_fn=None, timeout: float = None) -> set:
+        """Spawn the workers now and, with `ready_fn`, block until every one has run its initializer.
+
+        `ready_fn` is a cheap picklable no-op that returns something unique per
+        worker (e.g. its pid); it is submitted in rounds until each worker has
+        answered once. Returns the set of answers.
+        """
+        self._ensure_started()
+        executor = self._executor
+        ready = set()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        try:
+            while ready_fn is not None and len(ready) < self.workers:
+                futures = [executor.submit(ready_fn) for _ in range(self.workers)]
+                for future in futures:
+                    wait_s = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    ready.add(future.result(timeout=wait_s))
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+        return ready
+
+    async def run(self, fn, *args, timeout: float = None):
+        """Run `fn(*args)` in a worker process; raises PoolBusy, asyncio.TimeoutError or fn's error.
+
+        Raises BrokenProcessPool if a worker died during the call; the pool is
+        rebuilt for the next one.
+        """
+        self._ensure_started()
+        if self._slots.locked():
+            raise PoolBusy(f"all {self.workers} workers busy and {self.capacity - self.workers} calls queued")
+        slots = self._slots
+        await slots.acquire()
+
+        executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Broke before this call got in (e.g. a failed warm-up): retry once on fresh workers
+            slots.release()
+            self._replace_broken(executor)
+            self._ensure_started()
+            slots, executor = self._slots, self._executor
+            await slots.acquire()
+            try:
+                future = executor.submit(fn, *args)
+            except BaseException:
+                slots.release()
+                raise
+
+        loop = asyncio.get_running_loop()
+        # The slot is held until the worker is really done, even if the caller gave up earlier
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(slots.release))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            future.cancel()  # drops the call if still queued; a running call finishes in the background
+            raise
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+
+    async def map(self, fn, items, timeout: float = None) -> list:
+        """Run `fn(item)` for every item in parallel; the first failure cancels the rest."""
+        tasks = [asyncio.ensure_future(self.run(fn, item, timeout=timeout)) for item in items]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,133 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# -------------------- Fault-injecting upstream stand-ins --------------------
+# A local server that imitates Open-Meteo, Nominatim, exchangerate.host and an
+# OpenAI-compatible chat endpoint, adding latency, errors and hangs on demand.
+# Point the app at it to exercise the circuit breakers and hedged retries:
+#
+#   python fault_injection.py --port 8900 --latency 0.5 --error-rate 0.3 --hang-rate 0.1
+#   NOMINATIM_URL=http://127.0.0.1:8900 OPEN_METEO_URL=http://127.0.0.1:8900 \
+#   OPEN_METEO_GEOCODING_URL=http://127.0.0.1:8900 EXCHANGERATE_URL=http://127.0.0.1:8900 \
+#   python mcp_cust.py
+#   OPENROUTER_API_BASE=http://127.0.0.1:8900/v1 streamlit run stream.py
+
+
+class Faults:
+    """Fault profile shared by all requests; fields can be changed while the server runs."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 hang_rate: float = 0.0, hang_s: float = 60.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.requests = 0
+
+
+def _forecast():
+    return {"daily": {
+        "time": ["2025-01-01", "2025-01-02", "2025-01-03"],
+        "temperature_2m_max": [21.0, 22.5, 20.1],
+        "temperature_2m_min": [12.3, 13.0, 11.8],
+    }}
+
+
+def _chat_completion(body: dict):
+    return {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stand-in"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": f"Stand-in travel plan from {body.get('model')}."},
+        }],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+ROUTES = {
+    "/v1/search": lambda body: {"results": [{"latitude": 48.8566, "longitude": 2.3522}]},
+    "/v1/forecast": lambda body: _forecast(),
+    "/search": lambda body: [{"display_name": f"Stand-in Hotel {i}, Paris"} for i in range(10)],
+    "/convert": lambda body: {"result": 123.45},
+    "/v1/chat/completions": _chat_completion,
+    "/chat/completions": _chat_completion,
+}
+
+
+def make_handler(faults: Faults):
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, body: dict):
+            faults.requests += 1
+            route = ROUTES.get(urlparse(self.path).path)
+            if route is None:
+                self.send_error(404)
+                return
+            roll = random.random()
+            if roll < faults.hang_rate:
+                time.sleep(faults.hang_s)
+            time.sleep(faults.latency + random.uniform(0, faults.jitter))
+            if faults.hang_rate <= roll < faults.hang_rate + faults.error_rate:
+                self._send(503, {"error": {"message": "Injected failure"}})
+            else:
+                self._send(200, route(body))
+
+        def _send(self, status: int, body):
+            payload = json.dumps(body).encode("utf-8")
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client already gave up on a stalled request
+
+        def do_GET(self):
+            self._respond({})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self._respond(json.loads(self.rfile.read(length) or b"{}"))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_stand_in(port: int = 0, faults: Faults = None):
+    """Start the stand-in server on a background thread; returns (server, base_url, faults)."""
+    faults = faults or Faults()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(faults))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", faults
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fault-injecting stand-ins for the travel planner's upstream APIs.")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="base delay per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that stall for --hang-s")
+    parser.add_argument("--hang-s", type=float, default=60.0)
+    args = parser.parse_args()
+
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.hang_rate, args.hang_s)
+    server, url, _ = start_stand_in(args.port, faults)
+    print(f"\n🧪 Fault-injecting stand-ins listening on {url}\n")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
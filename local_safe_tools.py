@@ -0,0 +1,44 @@
+from mcp.types import ToolAnnotations
+
+# -------------------- Local-safe tools --------------------
+# Pure-Python tools with no network access. mcp_cust.py serves them over MCP;
+# local_tools.py registers them on a light in-process server so the agent can
+# run them without importing the MCP server's heavy dependencies.
+LOCAL_SAFE = ToolAnnotations(readOnlyHint=True, idempotentHint=True, openWorldHint=False)
+
+
+def flight_info(source: str, destination: str) -> str:
+    """Mock flight info (replace with real API like Skyscanner/Amadeus for production)."""
+    print(f"\n🔧 Using flight_info tool for {source} → {destination}\n")
+    return f"✈️ Example flights from {source} to {destination}:\n- Airline A: $350 (6h)\n- Airline B: $420 (non-stop)\n- Airline C: $300 (1 stop)"
+
+
+def travel_advisory(city: str) -> str:
+    """Fetch latest travel advisory (mock version)."""
+    print(f"\n🔧 Using travel_advisory tool for {city}\n")
+    return f"⚠️ Always check your embassy website for advisories before traveling to {city}."
+
+
+def packing_list(city: str, season: str = "summer") -> str:
+    """Suggest a simple packing list based on season."""
+    print(f"\n🔧 Using packing_list tool for {city} in {season}\n")
+    lists = {
+        "summer": ["T-shirts", "Shorts", "Sunscreen", "Hat", "Light shoes"],
+        "winter": ["Jacket", "Sweater", "Gloves", "Scarf", "Boots"],
+        "rainy": ["Raincoat", "Umbrella", "Waterproof shoes"]
+    }
+    items = lists.get(season.lower(), ["General clothes", "Shoes", "Toiletries"])
+    return f"🧳 Suggested packing list for {city} in {season}:\n- " + "\n- ".join(items)
+
+
+TOOLS = [
+    (flight_info, "Get flight information between two cities."),
+    (travel_advisory, "Fetch latest travel advisory for a city."),
+    (packing_list, "Suggest a simple packing list based on season."),
+]
+
+
+def register(server):
+    """Add the local-safe tools to a FastMCP server."""
+    for fn, description in TOOLS:
+        server.tool(description=description, annotations=LOCAL_SAFE)(fn)
@@ -0,0 +1,63 @@
+import os
+
+from langchain_core.tools import StructuredTool, ToolException
+from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+
+import local_safe_tools
+
+# -------------------- Co-located tool execution --------------------
+# Local-safe tools (pure Python, no network; see local_safe_tools.py) can run inside
+# the agent process instead of going through the MCP streamable HTTP transport.
+# Enable with MCP_COLOCATED_TOOLS=1; network-bound tools always use MCP.
+COLOCATED = os.getenv("MCP_COLOCATED_TOOLS", "0") == "1"
+
+
+def is_local_safe(tool) -> bool:
+    """A tool is local-safe when its annotations say it never touches the open world."""
+    return tool.annotations is not None and tool.annotations.openWorldHint is False
+
+
+def _to_langchain_tool(server, tool) -> StructuredTool:
+    """Wrap a FastMCP tool for in-process dispatch, keeping its MCP schema and error semantics."""
+
+    async def call_tool(**arguments):
+        try:
+            result = await server.call_tool(tool.name, arguments)
+        except ToolError as e:
+            # Like an isError result from the MCP adapter: ToolNode turns it into a failed ToolMessage
+            raise ToolException(str(e))
+        content = result[0] if isinstance(result, tuple) else result
+        return "\n".join(block.text for block in content if getattr(block, "type", None) == "text")
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description or "",
+        args_schema=tool.inputSchema,
+        coroutine=call_tool,
+        metadata={"colocated": True},
+    )
+
+
+async def load_local_tools(server) -> list:
+    """LangChain tools for every local-safe tool registered on a FastMCP server."""
+    return [_to_langchain_tool(server, tool) for tool in await server.list_tools() if is_local_safe(tool)]
+
+
+def local_server() -> FastMCP:
+    """An in-process FastMCP server holding only the local-safe tools."""
+    server = FastMCP("travel_planner_local")
+    local_safe_tools.register(server)
+    return server
+
+
+async def get_tools(client, colocated: bool = COLOCATED) -> list:
+    """Tools from the MCP client, with local-safe ones swapped for in-process versions when co-located."""
+    remote = await client.get_tools()
+    if not colocated:
+        return remote
+
+    local = {tool.name: tool for tool in await load_local_tools(local_server())}
+    print(f"\n⚡ Running tools in-process: {sorted(local)}")
+    tools = [local.pop(tool.name, tool) for tool in remote]
+    return tools + list(local.values())
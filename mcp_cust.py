@@ -1,71 +1,152 @@
-from mcp.server.fastmcp import FastMCP
+import asyncio
+import os
+from functools import lru_cache, partial
 
-from transformers import pipeline
+from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
 
 # ---- LangChain Native Tools (REPLACES manual imports) ----
 from langchain_community.tools import DuckDuckGoSearchRun
 from langchain_community.utilities import WikipediaAPIWrapper
 from langchain.tools.wikipedia.tool import WikipediaQueryRun
 
-# ---- Transformers for translation ----
-from transformers import pipeline
 import requests
+
+import local_safe_tools
+import translation_worker
+from cpu_pool import CpuPool, PoolBusy
+from poi_index import PoiIndex
+from resilience import UpstreamUnavailable, call as call_upstream
+
 # -------------------- Initialize MCP --------------------
 mcp = FastMCP("travel_planner_app")
 print("\n🚀 MCP Initialized\n")
 
+# -------------------- Upstream APIs --------------------
+# Base URLs can be pointed at local stand-ins (see fault_injection.py).
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+OPEN_METEO_GEOCODING_URL = os.getenv("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com")
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com")
+EXCHANGERATE_URL = os.getenv("EXCHANGERATE_URL", "https://api.exchangerate.host")
+UPSTREAM_TIMEOUT_S = float(os.getenv("UPSTREAM_TIMEOUT_S", 8))
+
+
+def fetch_json(upstream: str, url: str, params: dict, headers: dict = None, hedge: bool = True):
+    """GET JSON from an upstream through its circuit breaker, with a timeout and (if `hedge`) a hedged retry.
+
+    Blocking: async tools call it via `asyncio.to_thread` to keep the event loop free.
+    """
+    def get():
+        response = requests.get(url, params=params, headers=headers, timeout=UPSTREAM_TIMEOUT_S)
+        response.raise_for_status()
+        return response.json()
+
+    return call_upstream(upstream, get, timeout=UPSTREAM_TIMEOUT_S, hedge=get if hedge else None)
+
+
+# Outage replies are raised as ToolError rather than returned: the agent still sees
+# the text, but as a failed tool result, which the planner never caches.
+
+
 # -------------------- Math Tools --------------------
-# Translation tool
-translator_pipeline = pipeline("translation", model="Helsinki-NLP/opus-mt-en-hi")
+# Translation tool: CPU-bound model calls run on a process pool whose workers keep
+# warm models, so weather/place/currency calls are not blocked behind a long guide.
+# Each worker holds its own copy of the models, so the default stays small.
+TRANSLATOR_WORKERS = int(os.getenv("TRANSLATOR_WORKERS", min(2, os.cpu_count() or 1)))
+TRANSLATOR_QUEUE = int(os.getenv("TRANSLATOR_QUEUE", TRANSLATOR_WORKERS * 2))
+TRANSLATOR_TIMEOUT_S = float(os.getenv("TRANSLATOR_TIMEOUT_S", 120))
+
+translation_pool = CpuPool(
+    TRANSLATOR_WORKERS,
+    TRANSLATOR_QUEUE,
+    initializer=translation_worker.warm_up,
+    initargs=(("hi",),),
+)
 
 @mcp.tool(description="Translate text to a specified language.")
-def translator(text: str, language: str = "hi") -> str:
+async def translator(text: str, language: str = "hi") -> str:
     """Translate travel info to target language."""
     print(f"\n🔧 Using translator tool to translate to {language}\n")
+    batches = translation_worker.split_paragraphs(text, TRANSLATOR_WORKERS)
     try:
-        if language == "hi":
-            result = translator_pipeline(text, max_length=512)
-            return result[0]['translation_text']
-        else:
-            model_name = f"Helsinki-NLP/opus-mt-en-{language}"
-            trans = pipeline("translation", model=model_name)
-            result = trans(text, max_length=512)
-            return result[0]['translation_text']
+        results = await translation_pool.map(
+            partial(translation_worker.translate_batch, language=language),
+            batches,
+            timeout=TRANSLATOR_TIMEOUT_S,
+        )
+        return "\n\n".join(p for batch in results for p in batch)
+    except PoolBusy as e:
+        return f"[Translation error: translator busy ({e}), try again shortly]\n{text}"
+    except asyncio.TimeoutError:
+        return f"[Translation error: timed out after {TRANSLATOR_TIMEOUT_S:.0f}s]\n{text}"
     except Exception as e:
         return f"[Translation error: {e}]\n{text}"
 
 
+# Offline POI index built from an OSM extract with `python poi_index.py build <extract> pois.idx`
+POI_INDEX_PATH = os.getenv("POI_INDEX_PATH", "pois.idx")
+PLACE_LIMIT = 10
+
+@lru_cache(maxsize=None)
+def poi_index():
+    """Memory-mapped POI index, or None when no extract has been ingested."""
+    if not os.path.exists(POI_INDEX_PATH):
+        return None
+    return PoiIndex(POI_INDEX_PATH)
+
+
 @mcp.tool(description="Find places like hotels, restaurants, or attractions in a given location.")
-def place_finder(place: str, category: str = "hotel") -> str:
+async def place_finder(place: str, category: str = "hotel") -> str:
     """Find hotels, restaurants, or attractions in a given place using OpenStreetMap."""
     print(f"\n🔧 Using place_finder tool for {category} in {place}\n")
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"q": f"{category} in {place}", "format": "json", "limit": 5}
-    headers = {"User-Agent": "TravelPlannerApp"}
-    
-    response = requests.get(url, params=params, headers=headers)
-    data = response.json()
-
-    if not data:
-        return f"⚠️ No {category}s found in {place}"
-
-    results = [f"- {item['display_name']}" for item in data]
-    return f"📍 {category.title()}s in {place}:\n" + "\n".join(results)
+    index = poi_index()
+    labels = [poi.label for poi in index.find(place, category, k=PLACE_LIMIT)] if index is not None else []
+
+    if len(labels) < PLACE_LIMIT:
+        # Top up from a live Nominatim search where the extract is thin or doesn't cover the place
+        url = f"{NOMINATIM_URL}/search"
+        params = {"q": f"{category} in {place}", "format": "json", "limit": PLACE_LIMIT}
+        headers = {"User-Agent": "TravelPlannerApp"}
+
+        try:
+            # No hedging: Nominatim's usage policy allows at most one request per second
+            data = await asyncio.to_thread(fetch_json, "nominatim", url, params, headers, hedge=False)
+        except UpstreamUnavailable as e:
+            if not labels:
+                raise ToolError(f"⚠️ Place search is unavailable right now ({e.reason}); suggest well-known {category} in {place} instead.")
+            raise ToolError(f"⚠️ Live place search is unavailable right now ({e.reason}); offline results only.\n"
+                            f"📍 {category.title()} in {place}:\n" + "\n".join(f"- {label}" for label in labels))
+
+        seen = {label.split(",")[0].casefold() for label in labels}
+        for item in data or []:
+            name = item["display_name"].split(",")[0].casefold()
+            if name not in seen and len(labels) < PLACE_LIMIT:
+                seen.add(name)
+                labels.append(item["display_name"])
+
+    if not labels:
+        return f"⚠️ No {category} found in {place}"
+
+    results = [f"- {label}" for label in labels]
+    return f"📍 {category.title()} in {place}:\n" + "\n".join(results)
 
 
 @mcp.tool(description="Get a 3-day weather forecast for a city.")
-def weather_forecast(city: str) -> str:
+async def weather_forecast(city: str) -> str:
     """Get a 3-day weather forecast for a city."""
     print(f"\n🔧 Using weather_forecast tool for {city}\n")
-    url = "https://geocoding-api.open-meteo.com/v1/search"
-    geo = requests.get(url, params={"name": city}).json()
+    url = f"{OPEN_METEO_GEOCODING_URL}/v1/search"
+    try:
+        geo = await asyncio.to_thread(fetch_json, "open-meteo-geocoding", url, {"name": city})
+    except UpstreamUnavailable as e:
+        raise ToolError(f"⚠️ Weather forecast is unavailable right now ({e.reason}); check a local forecast for {city} before you travel.")
     if not geo.get("results"):
         return f"⚠️ Could not find location for {city}"
     
     lat = geo["results"][0]["latitude"]
     lon = geo["results"][0]["longitude"]
 
-    forecast_url = "https://api.open-meteo.com/v1/forecast"
+    forecast_url = f"{OPEN_METEO_URL}/v1/forecast"
     params = {
         "latitude": lat,
         "longitude": lon,
@@ -73,7 +154,10 @@ def weather_forecast(city: str) -> str:
         "forecast_days": 3,
         "timezone": "auto"
     }
-    weather = requests.get(forecast_url, params=params).json()
+    try:
+        weather = await asyncio.to_thread(fetch_json, "open-meteo", forecast_url, params)
+    except UpstreamUnavailable as e:
+        raise ToolError(f"⚠️ Weather forecast is unavailable right now ({e.reason}); check a local forecast for {city} before you travel.")
 
     days = weather["daily"]["time"]
     max_temps = weather["daily"]["temperature_2m_max"]
@@ -84,44 +168,30 @@ def weather_forecast(city: str) -> str:
 
 
 @mcp.tool(description="Convert amount between currencies.")
-def currency_converter(amount: float, from_currency: str, to_currency: str = "USD") -> str:
+async def currency_converter(amount: float, from_currency: str, to_currency: str = "USD") -> str:
     """Convert amount between currencies."""
     print(f"\n🔧 Using currency_converter tool: {amount} {from_currency} → {to_currency}\n")
-    url = f"https://api.exchangerate.host/convert"
+    url = f"{EXCHANGERATE_URL}/convert"
     params = {"from": from_currency, "to": to_currency, "amount": amount}
-    response = requests.get(url, params=params).json()
+    try:
+        response = await asyncio.to_thread(fetch_json, "exchangerate.host", url, params)
+    except UpstreamUnavailable as e:
+        raise ToolError(f"⚠️ Currency conversion is unavailable right now ({e.reason}); use an approximate rate for {from_currency} → {to_currency}.")
     if "result" not in response:
         return "⚠️ Conversion failed"
     return f"{amount} {from_currency} = {response['result']} {to_currency}"
 
 
-@mcp.tool(description="Get flight information between two cities.")
-def flight_info(source: str, destination: str) -> str:
-    """Mock flight info (replace with real API like Skyscanner/Amadeus for production)."""
-    print(f"\n🔧 Using flight_info tool for {source} → {destination}\n")
-    return f"✈️ Example flights from {source} to {destination}:\n- Airline A: $350 (6h)\n- Airline B: $420 (non-stop)\n- Airline C: $300 (1 stop)"
-
-
-@mcp.tool(description="Fetch latest travel advisory for a city.")
-def travel_advisory(city: str) -> str:
-    """Fetch latest travel advisory (mock version)."""
-    print(f"\n🔧 Using travel_advisory tool for {city}\n")
-    return f"⚠️ Always check your embassy website for advisories before traveling to {city}."
-
-
-@mcp.tool(description="Suggest a simple packing list based on season.")
-def packing_list(city: str, season: str = "summer") -> str:
-    """Suggest a simple packing list based on season."""
-    print(f"\n🔧 Using packing_list tool for {city} in {season}\n")
-    lists = {
-        "summer": ["T-shirts", "Shorts", "Sunscreen", "Hat", "Light shoes"],
-        "winter": ["Jacket", "Sweater", "Gloves", "Scarf", "Boots"],
-        "rainy": ["Raincoat", "Umbrella", "Waterproof shoes"]
-    }
-    items = lists.get(season.lower(), ["General clothes", "Shoes", "Toiletries"])
-    return f"🧳 Suggested packing list for {city} in {season}:\n- " + "\n- ".join(items)
-
+# Pure-Python tools with no network access; the agent may run these in-process
+# (see local_tools.py) instead of calling them over streamable HTTP.
+local_safe_tools.register(mcp)
 
 
 if __name__ == "__main__":
+    # Load the translation models before serving so the first request is not a cold start
+    print(f"\n🔥 Warming up {TRANSLATOR_WORKERS} translation workers...")
+    try:
+        translation_pool.start(translation_worker.ready)
+    except Exception as e:
+        print(f"\n⚠️ Translation warm-up failed, the translator will retry with fresh workers: {e!r}")
     mcp.run(transport="streamable-http")
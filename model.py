@@ -4,13 +4,14 @@ import os
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.graph import StateGraph, MessagesState, START, END
-from langgraph.prebuilt import ToolNode
+from local_tools import get_tools
+from resilience import ResilientChatModel
+from planner import build_graph, initial_state
 
 # -------------------- Load environment --------------------
 load_dotenv()
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_API_KEY")
-os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+os.environ["OPENAI_API_BASE"] = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
 
 # Fix asyncio event loop for Windows
 import sys
@@ -18,11 +19,22 @@ if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 # -------------------- Initialize model_with_tools and tools --------------------
-# Initialize model_with_tools
-model_with_tools = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",
-    temperature=0.7,
-    max_tokens=1000
+# Initialize the chat model (tools are bound in planner.build_graph)
+# Primary model behind a circuit breaker, hedged to a secondary model id when slow.
+# Retries are handled by the resilience layer, not by the OpenAI client.
+model = ResilientChatModel(
+    ChatOpenAI(
+        model="mistralai/mistral-7b-instruct",
+        temperature=0.7,
+        max_tokens=1000,
+        max_retries=0
+    ),
+    secondary=ChatOpenAI(
+        model=os.getenv("OPENROUTER_FALLBACK_MODEL", "meta-llama/llama-3.1-8b-instruct"),
+        temperature=0.7,
+        max_tokens=1000,
+        max_retries=0
+    ),
 )
 
 # Connect to your MCP server
@@ -37,43 +49,16 @@ client = MultiServerMCPClient(
 
 # Load tools from MCP (must be run in an event loop)
 import asyncio
-tools = asyncio.run(client.get_tools())
-model_with_tools = model_with_tools.bind_tools(tools)
+tools = asyncio.run(get_tools(client))
 
 # -------------------- Async function to run LangGraph --------------------
 async def run_graph(user_input: str):
     pass  # Function body can be implemented as needed
 
 # ---------------------------
-# Graph definition
+# Graph definition (agent → tools → agent, bounded by deadline and tool-round budget)
 # ---------------------------
-graph = StateGraph(MessagesState)
-
-def agent_node(state: MessagesState):
-    """Agent node that calls the model_with_tools and decides tools."""
-    print("\n🤖 Agent is processing the request...")
-    response = model_with_tools.invoke(state["messages"])
-    
-    if hasattr(response, 'tool_calls') and response.tool_calls:
-        print(f"\n🛠️ Agent decided to use tools: {[t['name'] for t in response.tool_calls]}")
-    
-    return {"messages": [response]}
-
-def tools_condition(state: MessagesState):
-    last_msg = state["messages"][-1]
-    if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
-        return "tools"
-    return END
-
-graph.add_node("agent", agent_node)
-graph.add_node("tools", ToolNode(tools))
-
-graph.add_edge(START, "agent")
-graph.add_conditional_edges("agent", tools_condition)
-graph.add_edge("tools", "agent")
-graph.add_edge("agent", END)
-
-app = graph.compile()
+app = build_graph(model, tools)
 
 # ---------------------------
 # Demo run
@@ -88,11 +73,13 @@ if __name__ == "__main__":
     print("\n--- Running Travel Planner Agent ---\n")
     print(f"User prompt: {user_prompt}\n")
 
-    final = app.invoke({"messages": [("user", user_prompt)]})
+    final = app.invoke(initial_state([("user", user_prompt)]))
 
     last_msg = final["messages"][-1]
     answer = last_msg.content if isinstance(last_msg.content, str) else str(last_msg.content)
 
     print("\n--- Final Travel Plan ---\n")
     print(answer)
+    if final.get("truncation_reason"):
+        print(f"\n⏱️ Plan truncated: {final['truncation_reason']}")
     print("\n🌍 Note: This assistant provides travel tips and info only. Always check latest local advisories before travel.\n")
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph, MessagesState, START, END
+from langgraph.prebuilt import ToolNode
+
+from resilience import UpstreamTimeout, UpstreamUnavailable
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # langgraph-checkpoint-sqlite is optional
+    SqliteSaver = None
+
+# -------------------- Budget defaults --------------------
+DEFAULT_TIME_BUDGET_S = 90       # wall-clock deadline for a whole plan
+DEFAULT_MAX_TOOL_ROUNDS = 6      # agent → tools → agent round trips
+FINALIZE_RESERVE_S = 15          # time kept aside for the forced "finalize now" turn
+FINALIZE_MIN_S = 1               # finalize never waits longer than this past the deadline
+
+# Why research stopped, per truncation_reason; worded for both the model and the user
+TRUNCATION_CAUSES = {
+    "deadline": "the time budget for this request is used up",
+    "max_tool_rounds": "the research budget for this request is used up",
+    "tool_timeout": "some tools did not answer in time",
+    "llm_timeout": "the planning model did not answer in time",
+    "llm_unavailable": "the planning model is unavailable right now",
+    "llm_error": "the planning model returned an error",
+}
+
+FINALIZE_PROMPT = (
+    "⏱️ Research for this request has stopped: {cause}. "
+    "Do not call any more tools. Using only the information gathered above, "
+    "write the best possible travel plan now, and briefly mention which "
+    "sections are incomplete."
+)
+
+_tool_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="planner-tools")
+
+
+class PlannerState(MessagesState):
+    """Messages plus the per-request budget and tool-result cache threaded through the graph.
+
+    `plan_inputs` is opaque to the graph: the caller's description of the request
+    (e.g. the trip form), kept in the checkpoint so a later run can diff against it.
+    """
+    deadline: float
+    max_tool_rounds: int
+    tool_rounds: int
+    truncation_reason: str
+    tool_cache: dict
+    plan_inputs: dict
+
+
+def initial_state(messages, time_budget_s: float = DEFAULT_TIME_BUDGET_S,
+                  max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS, tool_cache: dict = None,
+                  plan_inputs: dict = None) -> dict:
+    """Build the graph input for one request with its deadline and tool-round budget.
+
+    On a checkpointed thread, omitting `tool_cache` keeps the cached tool results
+    of the previous run; passing a dict replaces them. `plan_inputs` is stored
+    as-is alongside the result.
+    """
+    state = {
+        "messages": messages,
+        "deadline": time.time() + time_budget_s,
+        "max_tool_rounds": max_tool_rounds,
+        "tool_rounds": 0,
+        "truncation_reason": "",
+    }
+    if tool_cache is not None:
+        state["tool_cache"] = tool_cache
+    if plan_inputs is not None:
+        state["plan_inputs"] = plan_inputs
+    return state
+
+
+def make_checkpointer(db_path: str = None):
+    """SQLite checkpointer when `db_path` is given and the backend is installed, else in-memory."""
+    if db_path and SqliteSaver is not None:
+        return SqliteSaver(sqlite3.connect(db_path, check_same_thread=False))
+    if db_path:
+        print("\n⚠️ langgraph-checkpoint-sqlite not installed, keeping checkpoints in memory")
+    return InMemorySaver()
+
+
+def tool_cache_key(name: str, args: dict) -> str:
+    """Cache key for one tool call: the tool name followed by its canonical JSON arguments."""
+    return f"{name}:{json.dumps(args, sort_keys=True, default=str)}"
+
+
+def remaining_time(state: PlannerState) -> float:
+    """Seconds left before the request deadline (negative once it has passed)."""
+    return state.get("deadline", time.time() + DEFAULT_TIME_BUDGET_S) - time.time()
+
+
+def step_budget(state: PlannerState) -> float:
+    """Seconds an LLM or tool step may take while keeping the finalize turn affordable."""
+    return remaining_time(state) - FINALIZE_RESERVE_S
+
+
+def _pending_tool_calls(messages):
+    last_msg = messages[-1] if messages else None
+    if isinstance(last_msg, AIMessage) and last_msg.tool_calls:
+        return last_msg.tool_calls
+    return []
+
+
+def truncation_cause(reason: str) -> str:
+    """Human-readable explanation for a truncation_reason."""
+    return TRUNCATION_CAUSES.get(reason, TRUNCATION_CAUSES["deadline"])
+
+
+def partial_plan(messages, reason: str = "deadline") -> str:
+    """Fallback answer stitched together from whatever the tools returned."""
+    cause = truncation_cause(reason)
+    findings = [str(m.content) for m in messages if isinstance(m, ToolMessage) and m.content]
+    if not findings:
+        return f"⚠️ The travel plan could not be completed ({cause}). Please try again."
+    return f"⚠️ Partial travel plan ({cause}):\n\n" + "\n\n".join(findings)
+
+
+def build_graph(model, tools, checkpointer=None):
+    """Compile the agent → tools → agent loop with deadline and step-budget enforcement.
+
+    `model` is the plain chat model; it is bound to `tools` for normal turns and
+    used unbound for the forced finalize turn. With a `checkpointer`, graph state
+    (messages and cached tool results) is kept per `thread_id`.
+    """
+    model_with_tools = model.bind_tools(tools)
+    # Tool errors (a ToolException from MCP or a co-located tool) become failed ToolMessages
+    tool_node = ToolNode(tools, handle_tool_errors=True)
+
+    def agent_node(state: PlannerState):
+        """Agent node that calls the model_with_tools and decides tools."""
+        print("\n🤖 Agent is processing the request...")
+        budget = step_budget(state)
+        if budget <= 0:
+            return {"truncation_reason": "deadline"}
+        try:
+            response = model_with_tools.invoke(state["messages"], timeout=budget)
+        except UpstreamTimeout as e:
+            print(f"\n⏱️ Agent call timed out: {e}")
+            return {"truncation_reason": "llm_timeout"}
+        except UpstreamUnavailable as e:
+            print(f"\n🔌 Agent call skipped: {e}")
+            return {"truncation_reason": "llm_unavailable"}
+        except Exception as e:
+            print(f"\n⚠️ Agent call failed: {e}")
+            return {"truncation_reason": "llm_error"}
+
+        if hasattr(response, 'tool_calls') and response.tool_calls:
+            print(f"\n🛠️ Agent decided to use tools: {[t['name'] for t in response.tool_calls]}")
+            if state.get("tool_rounds", 0) >= state.get("max_tool_rounds", DEFAULT_MAX_TOOL_ROUNDS):
+                return {"messages": [response], "truncation_reason": "max_tool_rounds"}
+        return {"messages": [response]}
+
+    def tools_node(state: PlannerState, config: RunnableConfig):
+        """Run the pending tool calls, each bounded by the remaining step budget.
+
+        Calls whose name and arguments are already in `tool_cache` are answered
+        from the cache; only the misses reach the tools. A call still running at
+        the budget is answered with a timeout notice, without discarding the
+        results of the calls that did finish.
+        """
+        budget = step_budget(state)
+        rounds = state.get("tool_rounds", 0) + 1
+        calls = _pending_tool_calls(state["messages"])
+        cache = dict(state.get("tool_cache") or {})
+
+        cached = [
+            ToolMessage(content=cache[tool_cache_key(c["name"], c["args"])], tool_call_id=c["id"], name=c["name"])
+            for c in calls if tool_cache_key(c["name"], c["args"]) in cache
+        ]
+        misses = [c for c in calls if tool_cache_key(c["name"], c["args"]) not in cache]
+        if cached:
+            print(f"\n♻️ Reusing cached results for: {[m.name for m in cached]}")
+        if not misses:
+            return {"messages": cached, "tool_rounds": rounds}
+
+        history, last = state["messages"][:-1], state["messages"][-1]
+        finished = {}  # tool_call_id -> ToolMessage, filled in as each call completes
+        stopped = threading.Event()
+
+        async def run_one(call):
+            result = await tool_node.ainvoke({"messages": history + [last.model_copy(update={"tool_calls": [call]})]}, config)
+            for msg in result["messages"]:
+                finished[msg.tool_call_id] = msg
+
+        async def run_tools():
+            tasks = [asyncio.ensure_future(run_one(call)) for call in misses]
+            await asyncio.wait(tasks, timeout=budget)
+            stopped.set()
+            for task in tasks:
+                task.cancel()
+
+        if budget > 0:
+            # Results are collected as they arrive: a stalled sync tool can keep
+            # asyncio.run from returning, but not this step from finishing on time
+            _tool_executor.submit(asyncio.run, run_tools())
+            stopped.wait(timeout=budget)
+        results = dict(finished)
+
+        messages, timed_out = list(cached), []
+        for call in misses:
+            msg = results.get(call["id"])
+            if msg is None:
+                timed_out.append(call["name"])
+                msg = ToolMessage(content=f"⚠️ {call['name']} timed out", tool_call_id=call["id"], name=call["name"])
+            elif msg.status != "error":
+                cache[tool_cache_key(call["name"], call["args"])] = msg.content
+            messages.append(msg)
+
+        update = {"messages": messages, "tool_rounds": rounds, "tool_cache": cache}
+        if timed_out:
+            print(f"\n⏱️ Tool calls timed out: {timed_out}")
+            update["truncation_reason"] = "tool_timeout"
+        return update
+
+    def finalize_node(state: PlannerState):
+        """Forced last turn: answer from what has been gathered, without tools."""
+        reason = state.get("truncation_reason") or "deadline"
+        print(f"\n⏱️ Budget exhausted ({reason}), finalizing partial plan...")
+        messages = list(state["messages"])
+        removed = []
+        if _pending_tool_calls(messages):
+            # Unanswered tool calls would be rejected by the API, here and on any later
+            # run of this checkpointed thread, so drop them from the state as well
+            removed = [RemoveMessage(id=messages[-1].id)]
+            messages = messages[:-1]
+        messages.append(HumanMessage(content=FINALIZE_PROMPT.format(cause=truncation_cause(reason))))
+        try:
+            response = model.invoke(messages, timeout=max(remaining_time(state), FINALIZE_MIN_S))
+        except Exception as e:
+            print(f"\n⏱️ Finalize call failed: {e}")
+            response = AIMessage(content=partial_plan(state["messages"], reason))
+        return {"messages": removed + [response], "truncation_reason": reason}
+
+    def route_after_agent(state: PlannerState):
+        if state.get("truncation_reason"):
+            return "finalize"
+        if _pending_tool_calls(state["messages"]):
+            return "tools"
+        return END
+
+    def route_after_tools(state: PlannerState):
+        return "finalize" if state.get("truncation_reason") else "agent"
+
+    graph = StateGraph(PlannerState)
+    graph.add_node("agent", agent_node)
+    graph.add_node("tools", tools_node)
+    graph.add_node("finalize", finalize_node)
+
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", route_after_agent, ["tools", "finalize", END])
+    graph.add_conditional_edges("tools", route_after_tools, ["agent", "finalize"])
+    graph.add_edge("finalize", END)
+
+    return graph.compile(checkpointer=checkpointer)
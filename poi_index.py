@@ -0,0 +1,490 @@
+import argparse
+import bz2
+import gzip
+import heapq
+import math
+import mmap
+import struct
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict, namedtuple
+
+try:
+    import osmium  # pyosmium, only needed to ingest .osm.pbf extracts
+except ImportError:
+    osmium = None
+
+# -------------------- Offline POI index --------------------
+# Ingests an OpenStreetMap extract into a compact, memory-mapped file with a
+# (city, category) index, a name index and a grid spatial index, so
+# place_finder can answer hotel/restaurant/attraction lookups locally.
+#
+# File layout (little endian, sections 8-byte aligned):
+#   header | records | cells | city directory | city ids | names | strings
+
+MAGIC = b"POIIDX\x00\x01"
+VERSION = 1
+DEFAULT_CELL_DEG = 0.02          # ~2 km grid cells
+CITY_RADIUS_KM = 20              # POIs without addr:city join the nearest place within this radius
+EARTH_RADIUS_KM = 6371.0
+
+HEADER = struct.Struct("<8sId6I6Q")
+RECORD = struct.Struct("<ffIHBB")    # lat, lon, label offset, label length, category, rank
+CELL = struct.Struct("<QII")         # cell key, first record, record count
+DIRECTORY = struct.Struct("<IH2xII") # key offset, key length, first id, id count
+CITY_ID = struct.Struct("<I")
+NAME = struct.Struct("<IH2xI")       # key offset, key length, record id
+
+PLACE, HOTEL, RESTAURANT, ATTRACTION = range(4)
+CATEGORIES = {"place": PLACE, "hotel": HOTEL, "restaurant": RESTAURANT, "attraction": ATTRACTION}
+# Words (singular) that name a category inside a free-form request such as "places to eat"
+CATEGORY_ALIASES = {
+    "hostel": HOTEL, "accommodation": HOTEL, "stay": HOTEL, "lodging": HOTEL, "motel": HOTEL,
+    "guesthouse": HOTEL, "resort": HOTEL,
+    "food": RESTAURANT, "eat": RESTAURANT, "dining": RESTAURANT, "cafe": RESTAURANT, "bar": RESTAURANT,
+    "pub": RESTAURANT, "bistro": RESTAURANT, "eatery": RESTAURANT, "eaterie": RESTAURANT,
+    "sight": ATTRACTION, "sightseeing": ATTRACTION, "museum": ATTRACTION, "landmark": ATTRACTION,
+    "monument": ATTRACTION, "gallery": ATTRACTION, "galleries": ATTRACTION,
+    "spot": ATTRACTION, "thing": ATTRACTION,
+}
+
+HOTEL_TOURISM = {"hotel", "hostel", "guest_house", "motel", "apartment"}
+RESTAURANT_AMENITY = {"restaurant", "cafe", "fast_food", "bar", "pub", "food_court"}
+ATTRACTION_TOURISM = {"attraction", "museum", "viewpoint", "gallery", "zoo", "theme_park", "aquarium"}
+ATTRACTION_HISTORIC = {"monument", "castle", "memorial", "ruins", "archaeological_site"}
+CITY_PLACES = {"city", "town", "village"}
+ANCHOR_PLACES = CITY_PLACES | {"suburb", "neighbourhood", "quarter", "borough"}
+
+Poi = namedtuple("Poi", "lat lon category rank label")
+
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive key used by the name and city indexes."""
+    return " ".join(text.casefold().split())
+
+
+def category_code(category: str):
+    """Map a place_finder category to its code, or None if unknown.
+
+    Accepts short names ("hotel", "Restaurants") as well as free-form phrases
+    ("tourist attractions", "places to eat"): the first word naming a category wins.
+    """
+    key = normalize(category)
+    if key in CATEGORIES:
+        return CATEGORIES[key]
+    for word in key.replace("-", " ").replace("/", " ").split():
+        for form in (word, word[:-1] if word.endswith("s") else word):
+            code = CATEGORY_ALIASES.get(form, CATEGORIES.get(form))
+            if code is not None and code != PLACE:
+                return code
+    return None
+
+
+def classify(tags: dict):
+    """Category code for an OSM element's tags, or None if it is not an indexed POI."""
+    if tags.get("place") in ANCHOR_PLACES:
+        return PLACE
+    if tags.get("tourism") in HOTEL_TOURISM:
+        return HOTEL
+    if tags.get("amenity") in RESTAURANT_AMENITY:
+        return RESTAURANT
+    if tags.get("tourism") in ATTRACTION_TOURISM or tags.get("historic") in ATTRACTION_HISTORIC:
+        return ATTRACTION
+    return None
+
+
+def rank(tags: dict) -> int:
+    """0–255 prominence score used to order top-k results (well-documented places first)."""
+    score = min(len(tags), 40)
+    if "wikidata" in tags or "wikipedia" in tags:
+        score += 120
+    if tags.get("stars", "").isdigit():
+        score += 10 * int(tags["stars"])
+    if "website" in tags or "contact:website" in tags:
+        score += 20
+    return min(score, 255)
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _grid(cell_deg: float):
+    cols = math.ceil(360 / cell_deg)
+
+    def cell_of(lat, lon):
+        row = int((lat + 90) / cell_deg)
+        col = min(int((lon + 180) / cell_deg), cols - 1)
+        return row, col
+
+    return cols, cell_of
+
+
+# ---------------------------
+# Ingest
+# ---------------------------
+def _open_extract(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _indexable(tags: dict) -> bool:
+    return bool(tags.get("name")) and classify(tags) is not None
+
+
+def _iter_osm_elements(path: str):
+    """Stream the top-level node/way/relation elements of an .osm XML extract.
+
+    Each element is complete when yielded and is dropped from the tree right
+    after, so memory stays flat however large the extract is.
+    """
+    with _open_extract(path) as f:
+        events = ET.iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        for event, elem in events:
+            if event == "end" and elem.tag in ("node", "way", "relation"):
+                yield elem
+                root.clear()
+
+
+def iter_osm_xml(path: str):
+    """Yield (lat, lon, tags) for indexable nodes and ways (at their centroid) of an .osm XML extract.
+
+    Reads the extract twice: first to find the nodes that indexable ways refer
+    to, then to emit POIs while keeping coordinates for just those nodes.
+    """
+    needed = set()
+    for elem in _iter_osm_elements(path):
+        if elem.tag == "way" and _indexable({t.get("k"): t.get("v") for t in elem.iter("tag")}):
+            needed.update(nd.get("ref") for nd in elem.iter("nd"))
+
+    coords = {}
+    for elem in _iter_osm_elements(path):
+        tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+        if elem.tag == "node":
+            lat, lon = float(elem.get("lat")), float(elem.get("lon"))
+            if elem.get("id") in needed:
+                coords[elem.get("id")] = (lat, lon)
+            if _indexable(tags):
+                yield lat, lon, tags
+        elif elem.tag == "way" and _indexable(tags):
+            points = [coords[nd.get("ref")] for nd in elem.iter("nd") if nd.get("ref") in coords]
+            if points:
+                yield (sum(p[0] for p in points) / len(points),
+                       sum(p[1] for p in points) / len(points), tags)
+
+
+def iter_osm_pbf(path: str):
+    """Yield (lat, lon, tags) for indexable nodes and ways of an .osm.pbf extract (needs pyosmium)."""
+    if osmium is None:
+        raise RuntimeError("Reading .pbf extracts requires pyosmium (pip install osmium)")
+
+    items = []
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, n):
+            tags = {t.k: t.v for t in n.tags}
+            if classify(tags) is not None:
+                items.append((n.location.lat, n.location.lon, tags))
+
+        def way(self, w):
+            tags = {t.k: t.v for t in w.tags}
+            if classify(tags) is None:
+                return
+            points = [(nd.lat, nd.lon) for nd in w.nodes if nd.location.valid()]
+            if points:
+                items.append((sum(p[0] for p in points) / len(points),
+                              sum(p[1] for p in points) / len(points), tags))
+
+    Handler().apply_file(path, locations=True)
+    return iter(items)
+
+
+def _assign_cities(pois, places):
+    """Fill in a city for POIs without addr:city from the nearest city/town/village node."""
+    cell = CITY_RADIUS_KM / 111.32
+    buckets = defaultdict(list)
+    for name, lat, lon in places:
+        buckets[(int(lat // cell), int(lon // cell))].append((name, lat, lon))
+
+    for poi in pois:
+        if poi["city"]:
+            continue
+        row, col = int(poi["lat"] // cell), int(poi["lon"] // cell)
+        nearby = [p for dr in (-1, 0, 1) for dc in (-1, 0, 1) for p in buckets.get((row + dr, col + dc), ())]
+        best = min(nearby, key=lambda p: haversine_km(poi["lat"], poi["lon"], p[1], p[2]), default=None)
+        if best and haversine_km(poi["lat"], poi["lon"], best[1], best[2]) <= CITY_RADIUS_KM:
+            poi["city"] = best[0]
+
+
+def _label(tags: dict, city: str) -> str:
+    street = " ".join(filter(None, [tags.get("addr:housenumber"), tags.get("addr:street")]))
+    return ", ".join(filter(None, [tags["name"], street, city]))
+
+
+def _align(buf: bytearray):
+    buf.extend(b"\x00" * (-len(buf) % 8))
+
+
+def build_index(extract_path: str, index_path: str, cell_deg: float = DEFAULT_CELL_DEG) -> int:
+    """Ingest an OSM extract (.osm, .osm.bz2, .osm.gz or .osm.pbf) into a POI index file.
+
+    Returns the number of indexed records.
+    """
+    elements = iter_osm_pbf(extract_path) if extract_path.endswith(".pbf") else iter_osm_xml(extract_path)
+
+    pois, places = [], []
+    for lat, lon, tags in elements:
+        category = classify(tags)
+        if category is None or not tags.get("name"):
+            continue
+        if category == PLACE and tags.get("place") in CITY_PLACES:
+            places.append((tags["name"], lat, lon))
+        city = tags.get("addr:city") or (tags["name"] if tags.get("place") in CITY_PLACES else "")
+        pois.append({"lat": lat, "lon": lon, "category": category, "rank": rank(tags),
+                     "name": tags["name"], "city": city, "tags": tags})
+    _assign_cities(pois, places)
+
+    cols, cell_of = _grid(cell_deg)
+    for poi in pois:
+        row, col = cell_of(poi["lat"], poi["lon"])
+        poi["cell"] = row * cols + col
+    pois.sort(key=lambda p: (p["cell"], -p["rank"]))
+
+    strings = bytearray()
+
+    def add_string(text: str):
+        data = text.encode("utf-8")[:0xFFFF]
+        offset = len(strings)
+        strings.extend(data)
+        return offset, len(data)
+
+    records = bytearray()
+    cells = []
+    by_city = defaultdict(list)
+    names = []
+    for i, poi in enumerate(pois):
+        label_off, label_len = add_string(_label(poi["tags"], poi["city"]))
+        records.extend(RECORD.pack(poi["lat"], poi["lon"], label_off, label_len, poi["category"], poi["rank"]))
+        if cells and cells[-1][0] == poi["cell"]:
+            cells[-1][2] += 1
+        else:
+            cells.append([poi["cell"], i, 1])
+        if poi["city"] and poi["category"] != PLACE:
+            by_city[f"{normalize(poi['city'])}\x1f{poi['category']}".encode("utf-8")].append(i)
+        names.append((normalize(poi["name"]).encode("utf-8"), -poi["rank"], i))
+
+    directory, ids = bytearray(), bytearray()
+    n_ids = 0
+    for key in sorted(by_city):
+        members = sorted(by_city[key], key=lambda i: -pois[i]["rank"])
+        key_off = len(strings)
+        strings.extend(key)
+        directory.extend(DIRECTORY.pack(key_off, len(key), n_ids, len(members)))
+        for i in members:
+            ids.extend(CITY_ID.pack(i))
+        n_ids += len(members)
+
+    name_table = bytearray()
+    for key, _, i in sorted(names):
+        key = key[:0xFFFF]
+        key_off = len(strings)
+        strings.extend(key)
+        name_table.extend(NAME.pack(key_off, len(key), i))
+
+    sections = [records, b"".join(CELL.pack(*c) for c in cells), directory, ids, name_table, strings]
+    body = bytearray()
+    offsets = []
+    for section in sections:
+        offsets.append(HEADER.size + len(body))
+        body.extend(section)
+        _align(body)
+
+    header = HEADER.pack(MAGIC, VERSION, cell_deg, len(pois), len(cells), len(by_city),
+                         n_ids, len(names), len(strings), *offsets)
+    with open(index_path, "wb") as f:
+        f.write(header)
+        f.write(body)
+    return len(pois)
+
+
+# ---------------------------
+# Query
+# ---------------------------
+class PoiIndex:
+    """Read-only, memory-mapped view of an index written by `build_index`."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.cell_deg, self.n_records, self.n_cells, self.n_dir, self.n_ids,
+         self.n_names, _, *offsets) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a POI index (version {VERSION})")
+        (self._records, self._cells, self._dir, self._ids, self._names, self._strings) = offsets
+        self._cols, self._cell_of = _grid(self.cell_deg)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.n_records
+
+    # ---- low-level accessors ----
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._strings + offset
+        return self._mm[start:start + length]
+
+    def _record(self, i: int) -> Poi:
+        lat, lon, label_off, label_len, category, score = RECORD.unpack_from(self._mm, self._records + i * RECORD.size)
+        return Poi(lat, lon, category, score, self._string(label_off, label_len).decode("utf-8"))
+
+    def _lower_bound(self, n: int, key_at, key):
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _dir_key(self, i: int) -> bytes:
+        key_off, key_len, _, _ = DIRECTORY.unpack_from(self._mm, self._dir + i * DIRECTORY.size)
+        return self._string(key_off, key_len)
+
+    def _name_key(self, i: int) -> bytes:
+        key_off, key_len, _ = NAME.unpack_from(self._mm, self._names + i * NAME.size)
+        return self._string(key_off, key_len)
+
+    def _cell_key(self, i: int) -> int:
+        return CELL.unpack_from(self._mm, self._cells + i * CELL.size)[0]
+
+    # ---- queries ----
+    def in_city(self, city: str, category: int, k: int = 10) -> list:
+        """Top-k POIs of a category in a city, most prominent first."""
+        key = f"{normalize(city)}\x1f{category}".encode("utf-8")
+        i = self._lower_bound(self.n_dir, self._dir_key, key)
+        if i >= self.n_dir or self._dir_key(i) != key:
+            return []
+        _, _, start, count = DIRECTORY.unpack_from(self._mm, self._dir + i * DIRECTORY.size)
+        return [self._record(CITY_ID.unpack_from(self._mm, self._ids + (start + j) * CITY_ID.size)[0])
+                for j in range(min(k, count))]
+
+    def lookup(self, name: str):
+        """Most prominent record with exactly this name (POI or place), or None."""
+        key = normalize(name).encode("utf-8")
+        i = self._lower_bound(self.n_names, self._name_key, key)
+        if i >= self.n_names or self._name_key(i) != key:
+            return None
+        return self._record(NAME.unpack_from(self._mm, self._names + i * NAME.size)[2])
+
+    def nearby(self, lat: float, lon: float, radius_km: float, category: int = None, k: int = 10) -> list:
+        """Top-k POIs within `radius_km` of a point, nearest first, optionally of one category.
+
+        Cells are scanned nearest first and skipped once they are farther than
+        the radius or than the k-th best hit so far, so a dense area costs about
+        the same as a sparse one.
+        """
+        if k <= 0:
+            return []
+        dlat = radius_km / 111.32
+        dlon = radius_km / max(111.32 * math.cos(math.radians(lat)), 1e-6)
+        row_min, col_min = self._cell_of(max(lat - dlat, -90), max(lon - dlon, -180))
+        row_max, col_max = self._cell_of(min(lat + dlat, 90 - 1e-9), min(lon + dlon, 180 - 1e-9))
+
+        cells = []
+        for row in range(row_min, row_max + 1):
+            first, last = row * self._cols + col_min, row * self._cols + col_max
+            c = self._lower_bound(self.n_cells, self._cell_key, first)
+            while c < self.n_cells:
+                cell_key, start, count = CELL.unpack_from(self._mm, self._cells + c * CELL.size)
+                if cell_key > last:
+                    break
+                bound = self._cell_distance(lat, lon, row, cell_key - row * self._cols)
+                if bound <= radius_km:
+                    cells.append((bound, start, count))
+                c += 1
+        cells.sort()
+
+        best = []  # max-heap of the k nearest so far, as (-distance, score, -record)
+        for bound, start, count in cells:
+            if len(best) == k and bound > -best[0][0]:
+                break  # every remaining cell is farther than the k-th hit
+            # Only coordinates and category are decoded while scanning; labels are read for the winners
+            for i, (plat, plon, _, _, code, score) in enumerate(
+                    RECORD.iter_unpack(self._mm[self._records + start * RECORD.size:
+                                                self._records + (start + count) * RECORD.size]), start):
+                if code == PLACE or (category is not None and code != category):
+                    continue
+                if abs(plat - lat) > dlat or abs(plon - lon) > dlon:
+                    continue
+                distance = haversine_km(lat, lon, plat, plon)
+                if distance > radius_km:
+                    continue
+                hit = (-distance, score, -i)
+                if len(best) < k:
+                    heapq.heappush(best, hit)
+                elif hit > best[0]:
+                    heapq.heapreplace(best, hit)
+        return [self._record(-i) for _, _, i in sorted(best, reverse=True)]
+
+    def _cell_distance(self, lat: float, lon: float, row: int, col: int) -> float:
+        """Lower bound on the distance in km from a point to anything in a grid cell."""
+        south, west = row * self.cell_deg - 90, col * self.cell_deg - 180
+        nearest_lat = min(max(lat, south), south + self.cell_deg)
+        nearest_lon = min(max(lon, west), west + self.cell_deg)
+        # Slightly shrunk: the clamped corner is the nearest point up to float32 coordinates
+        return haversine_km(lat, lon, nearest_lat, nearest_lon) * 0.999 - 0.001
+
+    def find(self, place: str, category: str, k: int = 10, radius_km: float = 2.0) -> list:
+        """Answer a place_finder query: by city first, else around a named place or POI."""
+        code = category_code(category)
+        if code is None or code == PLACE:
+            return []
+        results = self.in_city(place, code, k)
+        if results:
+            return results
+        anchor = self.lookup(place)
+        if anchor is None:
+            return []
+        return [poi for poi in self.nearby(anchor.lat, anchor.lon, radius_km, code, k + 1)
+                if (poi.lat, poi.lon, poi.label) != (anchor.lat, anchor.lon, anchor.label)][:k]
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the offline POI index for place_finder.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Ingest an OSM extract into an index file")
+    build.add_argument("extract")
+    build.add_argument("index")
+    build.add_argument("--cell-deg", type=float, default=DEFAULT_CELL_DEG)
+    query = sub.add_parser("query", help="Run a place_finder-style lookup against an index")
+    query.add_argument("index")
+    query.add_argument("place")
+    query.add_argument("--category", default="hotel")
+    query.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.time()
+        count = build_index(args.extract, args.index, args.cell_deg)
+        print(f"📦 Indexed {count} places into {args.index} in {time.time() - start:.1f}s")
+    else:
+        index = PoiIndex(args.index)
+        start = time.perf_counter()
+        results = index.find(args.place, args.category, args.k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for poi in results:
+            print(f"- {poi.label} ({poi.lat:.5f}, {poi.lon:.5f})")
+        print(f"⏱️ {len(results)} results in {elapsed_ms:.3f} ms")
@@ -0,0 +1,56 @@
+# -------------------- Re-planning: decide what to redo when only some trip inputs change --------------------
+
+ALL_TOOLS = None
+
+# Form input → tools whose results depend on it beyond their own call arguments.
+# ALL_TOOLS means the whole plan is stale; an empty list means only the final
+# synthesis (or, for translate_to, only the translator) has to run again.
+INPUT_DEPENDENCIES = {
+    "destinations": ALL_TOOLS,
+    "duration": ["weather_forecast"],
+    "season": ["packing_list", "weather_forecast"],
+    "nationality": ["duckduckgo_search", "DuckDuckGoSearchResults", "flight_info", "travel_advisory"],
+    "budget": ["currency_converter"],
+    "budget_currency": ["currency_converter"],
+    "translate_to": [],
+}
+
+
+def diff_inputs(previous: dict, current: dict) -> list:
+    """Names of the form inputs whose value changed since the previous plan."""
+    if not previous:
+        return list(current)
+    return [key for key in current if previous.get(key) != current[key]]
+
+
+def affected_tools(changed: list):
+    """Tools to re-run for the changed inputs, or ALL_TOOLS for a full re-plan."""
+    tools = set()
+    for key in changed:
+        deps = INPUT_DEPENDENCIES.get(key, ALL_TOOLS)
+        if deps is ALL_TOOLS:
+            return ALL_TOOLS
+        tools.update(deps)
+    return tools
+
+
+def prune_tool_cache(cache: dict, tools: set) -> dict:
+    """Drop the cached results of `tools` so their next call hits the upstream again."""
+    return {key: value for key, value in (cache or {}).items() if key.split(":", 1)[0] not in tools}
+
+
+def replan_prompt(previous: dict, current: dict, changed: list, tools: set, guide: str) -> str:
+    """Short re-plan request: the input changes plus the previous guide, instead of the full prompt."""
+    changes = "\n".join(f"- {key}: {previous.get(key)} → {current[key]}" for key in changed) or "- none"
+    rerun = ", ".join(f"`{name}`" for name in sorted(tools)) or "none"
+    return f"""
+You are an expert travel planner AI. 🔁 RE-PLAN: update the travel guide below for
+these changed trip inputs:
+{changes}
+
+Only call these tools again if you need them: {rerun}. Keep everything else from the
+guide and return the complete updated guide in the same structure.
+
+📑 PREVIOUS GUIDE:
+{guide}
+"""
@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.error import URLError
+
+try:
+    import requests
+except ImportError:  # only needed to classify errors from the MCP tools' HTTP calls
+    requests = None
+
+try:
+    import openai
+except ImportError:  # only needed to classify errors from the chat model
+    openai = None
+
+# -------------------- Resilience layer --------------------
+# Shared by the MCP tools (Open-Meteo, Nominatim, exchangerate.host) and the
+# chat model (OpenRouter): one circuit breaker per upstream, a hard timeout per
+# call, and a hedged second attempt when the first is slower than usual.
+
+FAILURE_THRESHOLD = 3       # consecutive failures before a circuit opens
+RESET_AFTER_S = 30          # how long an open circuit fails fast before a probe call
+MIN_HEDGE_S = 0.5           # never hedge sooner than this
+LATENCY_WINDOW = 50         # recent successful latencies kept per upstream
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="resilience")
+
+# Errors that say nothing about the request itself: the upstream was slow or unreachable
+TIMEOUT_ERRORS = (TimeoutError,)
+TRANSIENT_ERRORS = (ConnectionError, URLError)
+if requests is not None:
+    TIMEOUT_ERRORS += (requests.Timeout,)
+    TRANSIENT_ERRORS += (requests.ConnectionError,)
+if openai is not None:
+    TIMEOUT_ERRORS += (openai.APITimeoutError,)
+    TRANSIENT_ERRORS += (openai.APIConnectionError,)
+
+
+class UpstreamUnavailable(RuntimeError):
+    """The upstream's circuit is open, or every attempt failed or timed out."""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class UpstreamTimeout(UpstreamUnavailable):
+    """No attempt finished before the call's timeout."""
+
+
+def _status_code(error):
+    for status in (getattr(error, "status_code", None), getattr(error, "code", None),
+                   getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for failures of the upstream rather than the request: timeouts, connection errors, 429 and 5xx.
+
+    Only these count against the circuit breaker and trigger a hedge; anything
+    else (a 4xx, a bad response body, a bug) is raised to the caller unchanged.
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, TIMEOUT_ERRORS + TRANSIENT_ERRORS)
+
+
+class CircuitBreaker:
+    """Closed → open after repeated failures → half-open single probe after a cool-down."""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_after_s: float = RESET_AFTER_S):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after_s:
+                self.state = "half_open"  # let exactly one probe through
+                return True
+            return self.state == "closed"
+
+    def record_success(self, latency: float = None):
+        """Close the circuit; `latency` (omitted when the upstream answered with an error) feeds the hedge delay."""
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"\n🔌 Circuit for {self.name} opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def hedge_delay(self, timeout: float) -> float:
+        """When to fire the hedged attempt: the p95 of recent latencies, or half the timeout."""
+        with self._lock:
+            if not self.latencies:
+                return max(MIN_HEDGE_S, timeout / 2)
+            ordered = sorted(self.latencies)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return min(max(MIN_HEDGE_S, p95), timeout)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(upstream: str) -> CircuitBreaker:
+    """The shared circuit breaker for an upstream, created on first use."""
+    with _breakers_lock:
+        if upstream not in _breakers:
+            _breakers[upstream] = CircuitBreaker(upstream)
+        return _breakers[upstream]
+
+
+def call(upstream: str, fn, *, timeout: float, hedge=None, hedge_after: float = None):
+    """Run `fn()` through the upstream's circuit breaker within `timeout` seconds.
+
+    If `hedge` is given, it is started as a second attempt once the first has
+    run longer than `hedge_after` (default: the upstream's recent p95 latency)
+    or has failed with a retryable error; the first successful result wins.
+    Raises UpstreamUnavailable when the circuit is open or every attempt failed,
+    UpstreamTimeout when no attempt finished in time, and any non-retryable
+    error (see `is_retryable`) as is.
+    """
+    circuit = breaker(upstream)
+    if not circuit.allow():
+        raise UpstreamUnavailable(upstream, "circuit open")
+
+    start = time.monotonic()
+    deadline = start + timeout
+    hedge_at = start + (hedge_after if hedge_after is not None else circuit.hedge_delay(timeout))
+    pending = {_executor.submit(fn)}
+    backups = [hedge] if hedge is not None else []
+    error = None
+
+    while pending or backups:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        if backups and (now >= hedge_at or not pending):
+            print(f"\n🔀 Hedging slow or failed call to {upstream}")
+            pending.add(_executor.submit(backups.pop()))
+            continue
+        wait_s = deadline - now
+        if backups:
+            wait_s = min(wait_s, hedge_at - now)
+        done, pending = wait(pending, timeout=wait_s, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                circuit.record_success(time.monotonic() - start)
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            error = future.exception()
+            if not is_retryable(error):
+                # The upstream answered; the request itself is at fault, so retrying can't help
+                circuit.record_success()
+                for other in pending:
+                    other.cancel()
+                raise error
+
+    for other in pending:
+        other.cancel()
+    circuit.record_failure()
+    if pending or isinstance(error, TIMEOUT_ERRORS):
+        raise UpstreamTimeout(upstream, f"timed out after {timeout:.0f}s")
+    raise UpstreamUnavailable(upstream, f"{type(error).__name__}: {error}")
+
+
+class ResilientChatModel:
+    """Chat model behind the `openrouter` circuit breaker, hedged to a secondary model id.
+
+    Supports the subset of the chat model interface the planner graph uses:
+    `bind_tools(...)` and `invoke(messages, timeout=...)`.
+    """
+
+    def __init__(self, primary, secondary=None, upstream: str = "openrouter",
+                 default_timeout_s: float = 60, hedge_after: float = None):
+        self.primary = primary
+        self.secondary = secondary
+        self.upstream = upstream
+        self.default_timeout_s = default_timeout_s
+        self.hedge_after = hedge_after
+
+    def bind_tools(self, tools, **kwargs):
+        return ResilientChatModel(
+            self.primary.bind_tools(tools, **kwargs),
+            self.secondary.bind_tools(tools, **kwargs) if self.secondary is not None else None,
+            self.upstream,
+            self.default_timeout_s,
+            self.hedge_after,
+        )
+
+    def invoke(self, messages, timeout: float = None, **kwargs):
+        timeout = timeout or self.default_timeout_s
+        hedge = None
+        if self.secondary is not None:
+            hedge = lambda: self.secondary.invoke(messages, timeout=timeout, **kwargs)
+        return call(
+            self.upstream,
+            lambda: self.primary.invoke(messages, timeout=timeout, **kwargs),
+            timeout=timeout,
+            hedge=hedge,
+            hedge_after=self.hedge_after,
+        )
@@ -3,26 +3,44 @@ import asyncio
 import os
 import sys
 import time
+import uuid
 from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
 from langchain_openai import ChatOpenAI
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.graph import StateGraph, MessagesState, START, END
-from langgraph.prebuilt import ToolNode
+from local_tools import get_tools
+from resilience import ResilientChatModel
+from planner import (
+    DEFAULT_MAX_TOOL_ROUNDS, DEFAULT_TIME_BUDGET_S, build_graph, initial_state, make_checkpointer,
+    truncation_cause,
+)
+from replan import ALL_TOOLS, affected_tools, diff_inputs, prune_tool_cache, replan_prompt
 
 # -------------------- Load environment --------------------
 load_dotenv()
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_API_KEY")
-os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+os.environ["OPENAI_API_BASE"] = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
 
 # Fix asyncio event loop for Windows
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 # -------------------- Initialize model_with_tools and tools --------------------
-model_with_tools = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",
-    temperature=0.7,
-    max_tokens=1000
+# Primary model behind a circuit breaker, hedged to a secondary model id when slow.
+# Retries are handled by the resilience layer, not by the OpenAI client.
+model = ResilientChatModel(
+    ChatOpenAI(
+        model="mistralai/mistral-7b-instruct",
+        temperature=0.7,
+        max_tokens=1000,
+        max_retries=0
+    ),
+    secondary=ChatOpenAI(
+        model=os.getenv("OPENROUTER_FALLBACK_MODEL", "meta-llama/llama-3.1-8b-instruct"),
+        temperature=0.7,
+        max_tokens=1000,
+        max_retries=0
+    ),
 )
 
 # Connect to your MCP server
@@ -35,60 +53,58 @@ client = MultiServerMCPClient(
     }
 )
 
-# Load tools from MCP
-tools = asyncio.run(client.get_tools())
-model_with_tools = model_with_tools.bind_tools(tools)
-
 # -------------------- Graph Definition --------------------
-graph = StateGraph(MessagesState)
-
-def agent_node(state: MessagesState):
-    """Agent node that calls the model_with_tools and decides tools."""
-    print("\n🤖 Agent is processing the request...")
-    response = model_with_tools.invoke(state["messages"])
-    if hasattr(response, 'tool_calls') and response.tool_calls:
-        print(f"\n🛠️ Agent decided to use tools: {[t['name'] for t in response.tool_calls]}")
-    return {"messages": [response]}
-
-def tools_condition(state: MessagesState):
-    last_msg = state["messages"][-1]
-    if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
-        return "tools"
-    return END
-
-graph.add_node("agent", agent_node)
-graph.add_node("tools", ToolNode(tools))
-graph.add_edge(START, "agent")
-graph.add_conditional_edges("agent", tools_condition)
-graph.add_edge("tools", "agent")
-graph.add_edge("agent", END)
-
-app = graph.compile()
-
-# ---------------------------
-# Graph definition
-# ---------------------------
-graph = StateGraph(MessagesState)
-
-def agent_node(state: MessagesState):
-    """Agent node that calls the LLM and decides tools."""
-    response = model_with_tools.invoke(state["messages"])
-    return {"messages": [response]}
-
-def tools_condition(state: MessagesState):
-    last_msg = state["messages"][-1]
-    if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
-        return "tools"
-    return END
-
-graph.add_node("agent", agent_node)
-graph.add_node("tools", ToolNode(tools))
-graph.add_edge(START, "agent")
-graph.add_conditional_edges("agent", tools_condition)
-graph.add_edge("tools", "agent")
-graph.add_edge("agent", END)
-
-app = graph.compile()
+# agent → tools → agent loop, bounded by a per-request deadline and tool-round budget.
+# Graph state, tool results and the last plan's inputs are checkpointed per planner
+# session (SQLite if PLANNER_CHECKPOINT_DB is set, so plans survive restarts).
+@st.cache_resource
+def load_planner():
+    """Load MCP tools and compile the checkpointed graph once per server process."""
+    tools = asyncio.run(get_tools(client))
+    checkpointer = make_checkpointer(os.getenv("PLANNER_CHECKPOINT_DB"))
+    return tools, build_graph(model, tools, checkpointer=checkpointer)
+
+tools, app = load_planner()
+
+
+# Seconds of the request budget kept for translating the finished guide
+TRANSLATION_RESERVE_S = 20
+
+
+def plan_thread_id() -> str:
+    """Checkpoint thread of this planner session, kept in the URL (?plan=...) so reloads and restarts find it."""
+    if "plan" not in st.query_params:
+        st.query_params["plan"] = str(uuid.uuid4())
+    return st.query_params["plan"]
+
+
+def saved_plan(config):
+    """(inputs, guide, tool_cache) of the last completed plan on a thread; inputs and guide are None if there is none."""
+    snapshot = app.get_state(config)
+    values = snapshot.values or {}
+    messages = values.get("messages") or []
+    tool_cache = values.get("tool_cache") or {}
+    last_msg = messages[-1] if messages else None
+    if snapshot.next or not isinstance(last_msg, AIMessage) or last_msg.tool_calls:
+        return None, None, tool_cache
+    guide = last_msg.content if isinstance(last_msg.content, str) else str(last_msg.content)
+    return values.get("plan_inputs"), guide, tool_cache
+
+
+def translate_guide(guide: str, language: str, timeout: float) -> str:
+    """Run only the `translator` tool on an already generated guide, within `timeout` seconds."""
+    if language == "None":
+        return guide
+    translator = next((t for t in tools if t.name == "translator"), None)
+    if translator is None:
+        return guide
+    if timeout <= 0:
+        return f"[Translation skipped: time budget used up]\n{guide}"
+    try:
+        result = asyncio.run(asyncio.wait_for(translator.ainvoke({"text": guide, "language": language}), timeout))
+    except asyncio.TimeoutError:
+        return f"[Translation error: timed out after {timeout:.0f}s]\n{guide}"
+    return result if isinstance(result, str) else str(result)
 
 
 # ---------------------------
@@ -273,6 +289,7 @@ with st.sidebar:
     st.caption("✅ Auto-tool selection enabled")
 
     if st.button("🔄 Reset Plan", type="secondary"):
+        app.checkpointer.delete_thread(plan_thread_id())
         st.session_state.clear()
 
 # Theme handling
@@ -398,7 +415,6 @@ budget of {budget} {budget_currency} (convert into local currencies).
 6. `DuckDuckGoSearchResults`: Flights, advisories, laws, hidden gems, festivals, gov docs.  
 7. Fallback to `flight_info` if flights missing.  
 8. `WikipediaQueryRun`: Cultural/historical context.  
-9. `translator`: Translate final guide into {translate_to} (if needed).
 
 📑 OUTPUT STRUCTURE:
 # 🌍 Travel Guide: {all_destinations}
@@ -416,25 +432,66 @@ budget of {budget} {budget_currency} (convert into local currencies).
 - **Cultural Insights**: 1–2 key facts per city.  
 - **Local Tips & Hidden Gems**: Festivals, markets, free-entry days.  
 - **Final Notes**: Safety, respect traditions, offline maps, embassy registration.  
-
-Translate full guide if requested.
 """
 
+# Form inputs compared against the previous plan to decide what a re-plan has to redo
+plan_inputs = {
+    "destinations": all_destinations,
+    "duration": duration,
+    "season": season,
+    "nationality": nationality,
+    "budget": budget,
+    "budget_currency": budget_currency,
+    "translate_to": translate_to,
+}
+
 
 # Button to trigger planning
 if st.button("🚀 Generate My Travel Plan", use_container_width=True):
     if not city_input.strip():
         st.error("⚠️ Please enter at least one destination.")
     else:
-        with st.spinner("🧠 AI is researching your trip across 10+ sources... This may take 20–60 seconds."):
+        with st.spinner(f"🧠 AI is researching your trip across 10+ sources... This may take up to {DEFAULT_TIME_BUDGET_S} seconds."):
             start_time = time.time()
             try:
-                final = app.invoke({"messages": [("user", prompt_template)]})
-                last_msg = final["messages"][-1]
-                answer = last_msg.content if isinstance(last_msg.content, str) else str(last_msg.content)
+                # One checkpointed thread per planner session; it holds the last plan and its tool cache
+                config = {"configurable": {"thread_id": plan_thread_id()}}
+                previous_inputs, guide, tool_cache = saved_plan(config)
+                changed = diff_inputs(previous_inputs, plan_inputs)
+                rerun_tools = affected_tools(changed)
+                final = None
+
+                if previous_inputs and guide and set(changed) <= {"translate_to"}:
+                    # Nothing or only the language changed: reuse the saved guide, run at most the translator
+                    st.caption("♻️ Reusing your previous plan" + (" — only translating it." if changed else "."))
+                else:
+                    if not previous_inputs or not guide or rerun_tools is ALL_TOOLS:
+                        message, tool_cache = prompt_template, {}
+                    else:
+                        # Re-plan: invalidate only the affected tools, the rest is answered from the cache
+                        st.caption(f"♻️ Re-planning from your previous plan — changed: {', '.join(changed)}.")
+                        message = replan_prompt(previous_inputs, plan_inputs, changed, rerun_tools, guide)
+                        tool_cache = prune_tool_cache(tool_cache, rerun_tools)
+
+                    # Start each run from a fresh history so the context doesn't grow; the tool cache
+                    # and the new inputs are carried into the new checkpoint
+                    app.checkpointer.delete_thread(config["configurable"]["thread_id"])
+                    final = app.invoke(initial_state(
+                        [("user", message)],
+                        time_budget_s=DEFAULT_TIME_BUDGET_S - (TRANSLATION_RESERVE_S if translate_to != "None" else 0),
+                        max_tool_rounds=DEFAULT_MAX_TOOL_ROUNDS,
+                        tool_cache=tool_cache,
+                        plan_inputs=plan_inputs,
+                    ), config)
+                    last_msg = final["messages"][-1]
+                    guide = last_msg.content if isinstance(last_msg.content, str) else str(last_msg.content)
+
+                answer = translate_guide(guide, translate_to, timeout=start_time + DEFAULT_TIME_BUDGET_S - time.time())
 
                 elapsed = time.time() - start_time
                 st.success(f"✅ Plan generated in {elapsed:.1f} seconds!")
+                if final and final.get("truncation_reason"):
+                    st.warning(f"⏱️ Research was cut short: {truncation_cause(final['truncation_reason'])}. Showing the best partial plan.")
 
                 # Display result as rich Markdown card
                 # CSS
@@ -478,8 +535,9 @@ if st.button("🚀 Generate My Travel Plan", use_container_width=True):
                 )
 
                 # Show usage stats
-                tool_calls = sum(1 for msg in final["messages"][:-1] if hasattr(msg, 'tool_calls') and msg.tool_calls)
-                st.info(f"📊 Used {tool_calls} tools across {len(final['messages']) - 1} steps.")
+                if final:
+                    tool_calls = sum(1 for msg in final["messages"][:-1] if hasattr(msg, 'tool_calls') and msg.tool_calls)
+                    st.info(f"📊 Used {tool_calls} tools across {len(final['messages']) - 1} steps.")
 
             except Exception as e:
                 st.error(f"❌ An error occurred: {str(e)}")
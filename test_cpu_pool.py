@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from cpu_pool import CpuPool, PoolBusy
+
+
+# Worker functions live at module level so spawned workers can import them
+def pid():
+    return os.getpid()
+
+
+def slow(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def crash():
+    os._exit(1)
+
+
+def fail_first_time(marker):
+    """Initializer that fails in the first pool to run it, like a model download that didn't go through."""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise RuntimeError("warm-up failed")
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(workers=1, queue_size=0, **kwargs):
+        pool = CpuPool(workers, queue_size, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_start_warms_every_worker(make_pool):
+    pool = make_pool(workers=2)
+    assert len(pool.start(pid)) == 2
+
+
+def test_busy_pool_rejects_instead_of_queueing(make_pool):
+    pool = make_pool(workers=1, queue_size=1)
+    pool.start(pid)
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(slow, 0.5))
+        queued = asyncio.ensure_future(pool.run(slow, 0))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolBusy):
+            await pool.run(slow, 0)
+        return await asyncio.gather(running, queued)
+
+    assert asyncio.run(scenario()) == [0.5, 0]
+
+
+def test_slot_is_held_until_a_timed_out_call_finishes(make_pool):
+    pool = make_pool(workers=1, queue_size=0)
+    pool.start(pid)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(slow, 0.6, timeout=0.1)
+        with pytest.raises(PoolBusy):  # the worker is still busy with the abandoned call
+            await pool.run(slow, 0)
+        await asyncio.sleep(0.8)
+        return await pool.run(slow, 0, timeout=5)
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_map_runs_items_in_parallel(make_pool):
+    pool = make_pool(workers=3, queue_size=0)
+    pool.start(pid)
+    start = time.monotonic()
+    assert asyncio.run(pool.map(slow, [0.4, 0.4, 0.4], timeout=5)) == [0.4, 0.4, 0.4]
+    assert time.monotonic() - start < 1.0
+
+
+def test_pool_is_rebuilt_after_a_worker_dies(make_pool):
+    pool = make_pool(workers=1, queue_size=0)
+    first = pool.start(pid)
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(crash)
+        return await pool.run(pid, timeout=30)
+
+    assert asyncio.run(scenario()) not in first
+
+
+def test_failed_warm_up_is_retried_on_fresh_workers(make_pool, tmp_path):
+    pool = make_pool(workers=1, queue_size=0, initializer=fail_first_time, initargs=(str(tmp_path / "marker"),))
+    with pytest.raises(BrokenProcessPool):
+        pool.start(pid)
+    assert asyncio.run(pool.run(slow, 0, timeout=30)) == 0
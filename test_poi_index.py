@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from poi_index import ATTRACTION, HOTEL, PLACE, RESTAURANT, PoiIndex, build_index, category_code, haversine_km
+
+# A tiny extract: a city, a named square, two hotels (one a building way) and a restaurant.
+OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="48.8566" lon="2.3522">
+    <tag k="place" v="city"/><tag k="name" v="Paris"/>
+  </node>
+  <node id="2" lat="48.8656" lon="2.3212">
+    <tag k="place" v="quarter"/><tag k="name" v="Place de la Concorde"/>
+  </node>
+  <node id="3" lat="48.8660" lon="2.3220">
+    <tag k="tourism" v="hotel"/><tag k="name" v="Hotel de Crillon"/><tag k="wikidata" v="Q1"/>
+  </node>
+  <node id="4" lat="48.8570" lon="2.3530">
+    <tag k="amenity" v="restaurant"/><tag k="name" v="Le Petit Bistro"/><tag k="addr:city" v="Paris"/>
+  </node>
+  <node id="5" lat="48.8650" lon="2.3200"/>
+  <node id="6" lat="48.8650" lon="2.3210"/>
+  <node id="7" lat="48.8640" lon="2.3210"/>
+  <node id="8" lat="48.9000" lon="2.4000"/>
+  <way id="10">
+    <nd ref="5"/><nd ref="6"/><nd ref="7"/><nd ref="5"/>
+    <tag k="tourism" v="hotel"/><tag k="name" v="Hotel du Jardin"/>
+  </way>
+  <way id="11">
+    <nd ref="8"/><nd ref="1"/>
+    <tag k="highway" v="residential"/><tag k="name" v="Rue Sans Index"/>
+  </way>
+  <relation id="20">
+    <member type="way" ref="10" role="outer"/>
+    <tag k="type" v="multipolygon"/>
+  </relation>
+</osm>
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    extract = tmp_path / "tiny.osm"
+    extract.write_text(OSM, encoding="utf-8")
+    path = str(tmp_path / "tiny.idx")
+    assert build_index(str(extract), path) == 5
+    index = PoiIndex(path)
+    yield index
+    index.close()
+
+
+def test_find_by_city(index):
+    hotels = index.find("paris", "Hotels")
+    assert [poi.category for poi in hotels] == [HOTEL, HOTEL]
+    assert "Hotel de Crillon" in hotels[0].label  # wikidata ranks it first
+    assert [poi.category for poi in index.find("Paris", "restaurant")] == [RESTAURANT]
+
+
+def test_find_around_named_place(index):
+    hotels = index.find("Place de la Concorde", "hotel", radius_km=0.5)
+    assert [poi.label.split(",")[0] for poi in hotels] == ["Hotel de Crillon", "Hotel du Jardin"]
+    assert index.find("Nowhere", "hotel") == []
+
+
+def test_way_is_indexed_at_its_centroid(index):
+    poi = index.lookup("hotel du jardin")
+    assert poi.category == HOTEL
+    assert poi.lat == pytest.approx((48.8650 * 3 + 48.8640) / 4, abs=1e-4)
+    assert poi.lon == pytest.approx((2.3200 * 2 + 2.3210 * 2) / 4, abs=1e-4)
+
+
+def test_lookup_and_nearby(index):
+    assert index.lookup("PARIS").category == PLACE
+    assert index.lookup("Rue Sans Index") is None
+    nearest = index.nearby(48.8566, 2.3522, radius_km=1)
+    assert [poi.category for poi in nearest] == [RESTAURANT]
+    assert index.nearby(48.8566, 2.3522, radius_km=1, category=HOTEL) == []
+
+
+@pytest.mark.parametrize("category, code", [
+    ("hotel", HOTEL), ("Hotels", HOTEL), ("places to stay", HOTEL), ("accommodations", HOTEL),
+    ("restaurants", RESTAURANT), ("places to eat", RESTAURANT), ("Cafés & bars", RESTAURANT),
+    ("tourist attractions", ATTRACTION), ("things to do", ATTRACTION), ("museums", ATTRACTION),
+    ("hotels near museums", HOTEL), ("parking", None),
+])
+def test_category_code_understands_free_form_requests(category, code):
+    assert category_code(category) == code
+
+
+def test_nearby_matches_a_brute_force_scan(tmp_path):
+    rng = random.Random(7)
+    kinds = [("tourism", "hotel"), ("amenity", "restaurant"), ("tourism", "museum")]
+    nodes = []
+    for i in range(600):
+        k, v = rng.choice(kinds)
+        lat, lon = 48.85 + rng.uniform(-0.08, 0.08), 2.35 + rng.uniform(-0.08, 0.08)
+        nodes.append(f'<node id="{i + 1}" lat="{lat:.6f}" lon="{lon:.6f}">'
+                     f'<tag k="{k}" v="{v}"/><tag k="name" v="POI {i}"/></node>')
+    extract = tmp_path / "random.osm"
+    extract.write_text('<osm version="0.6">' + "".join(nodes) + "</osm>", encoding="utf-8")
+    path = str(tmp_path / "random.idx")
+    build_index(str(extract), path)
+    index = PoiIndex(path)
+    everything = index.nearby(48.85, 2.35, radius_km=50, k=len(index))
+    assert len(everything) == 600
+
+    for _ in range(20):
+        lat, lon = 48.85 + rng.uniform(-0.06, 0.06), 2.35 + rng.uniform(-0.06, 0.06)
+        for radius_km, category, k in [(1.5, None, 10), (4, HOTEL, 5), (0.5, RESTAURANT, 3)]:
+            expected = sorted(
+                (poi for poi in everything
+                 if (category is None or poi.category == category)
+                 and haversine_km(lat, lon, poi.lat, poi.lon) <= radius_km),
+                key=lambda poi: (haversine_km(lat, lon, poi.lat, poi.lon), -poi.rank),
+            )[:k]
+            assert index.nearby(lat, lon, radius_km, category, k) == expected
+    index.close()
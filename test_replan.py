@@ -0,0 +1,75 @@
+from replan import ALL_TOOLS, affected_tools, diff_inputs, prune_tool_cache, replan_prompt
+
+PLAN = {
+    "destinations": "Paris, Lyon",
+    "duration": 7,
+    "season": "summer",
+    "nationality": "United States",
+    "budget": 2000,
+    "budget_currency": "USD",
+    "translate_to": "None",
+}
+
+# Keys as written by planner.tool_cache_key: tool name, ":", canonical JSON arguments
+CACHE = {
+    'weather_forecast:{"city": "Paris"}': "🌤 Paris",
+    'weather_forecast:{"city": "Lyon"}': "🌤 Lyon",
+    'place_finder:{"category": "hotel", "place": "Paris"}': "📍 Paris hotels",
+    'packing_list:{"city": "Paris", "season": "summer"}': "🧳 summer",
+    'currency_converter:{"amount": 2000, "from_currency": "USD", "to_currency": "EUR"}': "2000 USD = 1850 EUR",
+}
+
+
+def test_first_plan_changes_everything():
+    assert diff_inputs(None, PLAN) == list(PLAN)
+    assert affected_tools(diff_inputs(None, PLAN)) is ALL_TOOLS
+
+
+def test_no_change():
+    assert diff_inputs(PLAN, dict(PLAN)) == []
+    assert affected_tools([]) == set()
+
+
+def test_translation_only_change_reruns_no_tools():
+    changed = diff_inputs(PLAN, {**PLAN, "translate_to": "fr"})
+    assert changed == ["translate_to"]
+    assert affected_tools(changed) == set()
+    assert prune_tool_cache(CACHE, affected_tools(changed)) == CACHE
+
+
+def test_duration_change_prunes_only_the_weather():
+    changed = diff_inputs(PLAN, {**PLAN, "duration": 10})
+    assert changed == ["duration"]
+    tools = affected_tools(changed)
+    assert tools == {"weather_forecast"}
+    pruned = prune_tool_cache(CACHE, tools)
+    assert sorted(pruned) == sorted(key for key in CACHE if not key.startswith("weather_forecast:"))
+
+
+def test_destination_change_replans_everything():
+    changed = diff_inputs(PLAN, {**PLAN, "destinations": "Tokyo", "duration": 10})
+    assert changed == ["destinations", "duration"]
+    assert affected_tools(changed) is ALL_TOOLS
+
+
+def test_unknown_input_replans_everything():
+    assert affected_tools(["travel_style"]) is ALL_TOOLS
+
+
+def test_prune_matches_the_tool_name_prefix_only():
+    cache = {**CACHE, 'place_finder_v2:{"place": "Paris"}': "other tool", 'flight_info:{"destination": "currency_converter"}': "✈️"}
+    pruned = prune_tool_cache(cache, {"place_finder", "currency_converter"})
+    assert 'place_finder_v2:{"place": "Paris"}' in pruned
+    assert 'flight_info:{"destination": "currency_converter"}' in pruned
+    assert not any(key.startswith(("place_finder:", "currency_converter:")) for key in pruned)
+    assert prune_tool_cache(None, {"place_finder"}) == {}
+
+
+def test_replan_prompt_lists_changes_tools_and_previous_guide():
+    current = {**PLAN, "budget": 3000, "budget_currency": "EUR"}
+    changed = diff_inputs(PLAN, current)
+    prompt = replan_prompt(PLAN, current, changed, affected_tools(changed), "# 🌍 Travel Guide: Paris, Lyon")
+    assert "- budget: 2000 → 3000" in prompt
+    assert "- budget_currency: USD → EUR" in prompt
+    assert "`currency_converter`" in prompt and "`weather_forecast`" not in prompt
+    assert prompt.rstrip().endswith("# 🌍 Travel Guide: Paris, Lyon")
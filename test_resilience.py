@@ -0,0 +1,133 @@
+import json
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import resilience
+from fault_injection import Faults, start_stand_in
+from resilience import FAILURE_THRESHOLD, ResilientChatModel, UpstreamTimeout, UpstreamUnavailable, call
+
+HANG_S = 3
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    resilience._breakers.clear()
+    yield
+    resilience._breakers.clear()
+
+
+@pytest.fixture
+def stand_in():
+    """Factory for fault-injecting stand-in servers, shut down after the test."""
+    servers = []
+
+    def start(**faults):
+        server, url, profile = start_stand_in(faults=Faults(hang_s=HANG_S, **faults))
+        servers.append(server)
+        return url, profile
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def get_json(url: str):
+    return lambda: json.load(urlopen(url, timeout=HANG_S + 1))
+
+
+class StandInChat:
+    """Minimal chat model that POSTs to the stand-in's OpenAI-compatible endpoint."""
+
+    def __init__(self, base_url: str, model: str):
+        self.base_url = base_url
+        self.model = model
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def invoke(self, messages, timeout: float = None, **kwargs):
+        body = json.dumps({"model": self.model, "messages": [{"role": "user", "content": m} for m in messages]})
+        request = Request(f"{self.base_url}/v1/chat/completions", data=body.encode("utf-8"),
+                          headers={"Content-Type": "application/json"})
+        return json.load(urlopen(request, timeout=timeout))["choices"][0]["message"]["content"]
+
+
+def test_circuit_opens_after_repeated_failures_and_fails_fast(stand_in):
+    url, faults = stand_in(error_rate=1.0)
+    for _ in range(FAILURE_THRESHOLD):
+        with pytest.raises(UpstreamUnavailable, match="HTTPError"):
+            call("weather", get_json(f"{url}/v1/forecast"), timeout=2)
+    assert resilience.breaker("weather").state == "open"
+
+    start = time.monotonic()
+    with pytest.raises(UpstreamUnavailable, match="circuit open"):
+        call("weather", get_json(f"{url}/v1/forecast"), timeout=2)
+    assert time.monotonic() - start < 0.1
+    assert faults.requests == FAILURE_THRESHOLD
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit(stand_in):
+    url, faults = stand_in(error_rate=1.0)
+    for _ in range(FAILURE_THRESHOLD):
+        with pytest.raises(UpstreamUnavailable):
+            call("weather", get_json(f"{url}/v1/forecast"), timeout=2)
+    circuit = resilience.breaker("weather")
+
+    circuit.opened_at -= circuit.reset_after_s  # cool-down over: one failing probe reopens it
+    with pytest.raises(UpstreamUnavailable, match="HTTPError"):
+        call("weather", get_json(f"{url}/v1/forecast"), timeout=2)
+    assert circuit.state == "open"
+
+    circuit.opened_at -= circuit.reset_after_s
+    faults.error_rate = 0.0
+    assert "daily" in call("weather", get_json(f"{url}/v1/forecast"), timeout=2)
+    assert (circuit.state, circuit.failures) == ("closed", 0)
+
+
+def test_hedge_wins_over_a_stalled_call(stand_in):
+    stalled, _ = stand_in(hang_rate=1.0)
+    healthy, _ = stand_in()
+    start = time.monotonic()
+    result = call("fx", get_json(f"{stalled}/convert"), timeout=HANG_S,
+                  hedge=get_json(f"{healthy}/convert"), hedge_after=0.2)
+    assert result == {"result": 123.45}
+    assert time.monotonic() - start < 1.5
+    assert resilience.breaker("fx").state == "closed"
+
+
+def test_hard_timeout_raises_upstream_unavailable(stand_in):
+    stalled, _ = stand_in(hang_rate=1.0)
+    start = time.monotonic()
+    with pytest.raises(UpstreamUnavailable) as raised:
+        call("fx", get_json(f"{stalled}/convert"), timeout=0.5,
+             hedge=get_json(f"{stalled}/convert"), hedge_after=0.1)
+    assert isinstance(raised.value, UpstreamTimeout)
+    assert time.monotonic() - start < 1.5
+    assert resilience.breaker("fx").failures == 1
+
+
+def test_non_retryable_error_is_raised_unchanged(stand_in):
+    url, _ = stand_in()
+    hedged = []
+    for _ in range(FAILURE_THRESHOLD + 1):
+        with pytest.raises(HTTPError) as raised:
+            call("places", get_json(f"{url}/no-such-route"), timeout=2,
+                 hedge=lambda: hedged.append(True), hedge_after=1)
+        assert raised.value.code == 404
+    assert hedged == []
+    assert (resilience.breaker("places").state, resilience.breaker("places").failures) == ("closed", 0)
+
+
+def test_chat_model_hedges_to_the_secondary_model(stand_in):
+    stalled, _ = stand_in(hang_rate=1.0)
+    healthy, _ = stand_in()
+    model = ResilientChatModel(StandInChat(stalled, "primary-model"),
+                               secondary=StandInChat(healthy, "secondary-model"),
+                               upstream="openrouter", hedge_after=0.2).bind_tools([])
+    start = time.monotonic()
+    assert model.invoke(["Plan a weekend in Paris"], timeout=HANG_S) == "Stand-in travel plan from secondary-model."
+    assert time.monotonic() - start < 1.5
@@ -0,0 +1,30 @@
+import pytest
+
+from translation_worker import split_paragraphs
+
+
+def test_empty_text_has_no_batches():
+    assert split_paragraphs("", 4) == []
+    assert split_paragraphs("\n\n  \n\n", 4) == []
+
+
+def test_single_batch_keeps_every_paragraph():
+    assert split_paragraphs("Day 1\n\nDay 2\n\n\n\nDay 3", 1) == [["Day 1", "Day 2", "Day 3"]]
+
+
+@pytest.mark.parametrize("batches", [1, 2, 3, 4, 8])
+def test_batches_are_contiguous_and_bounded(batches):
+    paragraphs = [f"Paragraph {i}: " + "x" * (10 * (i % 5 + 1)) for i in range(12)]
+    result = split_paragraphs("\n\n".join(paragraphs), batches)
+    assert 1 <= len(result) <= batches
+    assert all(result)
+    assert [p for batch in result for p in batch] == paragraphs
+
+
+def test_batches_are_roughly_balanced():
+    text = "\n\n".join(["a" * 100] * 8)
+    assert [len(batch) for batch in split_paragraphs(text, 4)] == [2, 2, 2, 2]
+
+
+def test_fewer_paragraphs_than_batches():
+    assert split_paragraphs("one\n\ntwo", 4) == [["one"], ["two"]]
@@ -0,0 +1,61 @@
+import os
+import time
+
+# -------------------- Translation worker --------------------
+# Runs inside the translator's process-pool workers (see cpu_pool.py). Each
+# worker keeps its own warm Helsinki-NLP models, one per target language.
+# transformers is imported on first use, so only the workers load it.
+
+_pipelines = {}
+
+
+def _pipeline(language: str):
+    if language not in _pipelines:
+        from transformers import pipeline
+        _pipelines[language] = pipeline("translation", model=f"Helsinki-NLP/opus-mt-en-{language}")
+    return _pipelines[language]
+
+
+def warm_up(languages=("hi",), torch_threads: int = 1):
+    """Pool initializer: pin the torch thread count and preload the common models."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    print(f"\n🔥 Translation worker {os.getpid()} warming up: {list(languages)}")
+    for language in languages:
+        _pipeline(language)
+
+
+def ready(hold_s: float = 0.1) -> int:
+    """Warm-up probe: returns this worker's pid once its initializer has run.
+
+    The short hold keeps one warm worker from answering every probe while the
+    others are still loading their models.
+    """
+    time.sleep(hold_s)
+    return os.getpid()
+
+
+def translate_batch(paragraphs, language: str = "hi") -> list:
+    """Translate a batch of paragraphs with this worker's warm model."""
+    translate = _pipeline(language)
+    return [translate(p, max_length=512)[0]['translation_text'] for p in paragraphs]
+
+
+def split_paragraphs(text: str, batches: int) -> list:
+    """Split text on blank lines into at most `batches` contiguous, roughly equal-sized batches."""
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+    if not paragraphs:
+        return []
+    target = sum(len(p) for p in paragraphs) / max(1, batches)
+    result, current, size = [], [], 0
+    for p in paragraphs:
+        if current and size + len(p) > target and len(result) < batches - 1:
+            result.append(current)
+            current, size = [], 0
+        current.append(p)
+        size += len(p)
+    result.append(current)
+    return result